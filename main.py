@@ -1,14 +1,22 @@
 import asyncio
 import aiohttp
-import csv
-from datetime import datetime, timedelta
-from typing import Generator, Optional
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pac
+import time
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from typing import Dict, Generator, List, Optional, Tuple, Union
+from urllib.parse import quote
+from yarl import URL
 
 from fastapi.templating import Jinja2Templates
 #  from fastapi.responses import TemplateResponse  # 从responses模块导入
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, Path
 from fastapi.responses import RedirectResponse, HTMLResponse
-from sqlalchemy import create_engine
+from sqlalchemy import Integer, cast, create_engine, event, func, select, update
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker, Session
 
 # 导入数据模型（解耦模型定义与业务逻辑）
@@ -19,9 +27,32 @@ from models import Base, City, DefaultCity
 DATABASE_URL = "sqlite:///./cities.db"
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite单线程限制解决方案
+    connect_args={
+        "check_same_thread": False,  # SQLite单线程限制解决方案
+        "cached_statements": 256     # sqlite3驱动层预编译语句缓存（默认128）
+    },
+    query_cache_size=1200,  # SQLAlchemy编译SQL缓存，热点查询只编译一次
+    poolclass=QueuePool,  # 连接池复用数据库连接，避免每个请求重新打开文件
+    pool_size=10,
     echo=False  # 生产环境关闭SQL日志，减少性能消耗
 )
+
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """每个新建的SQLite连接设置性能相关PRAGMA
+    
+    WAL模式允许写入期间并发读取；synchronous=NORMAL在WAL下仍保证一致性，
+    但减少每次提交的fsync次数
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256MB内存映射
+    cursor.execute("PRAGMA cache_size=-65536")    # 64MB页缓存（负数单位为KB）
+    cursor.close()
+
 # 数据库会话工厂（每次请求独立会话）
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -34,6 +65,32 @@ app = FastAPI(
 # 模板引擎配置（指定前端页面目录）
 templates = Jinja2Templates(directory="templates")
 
+
+def format_timestamp(timestamp: int) -> str:
+    """模板过滤器：将UTC Unix时间戳格式化为可读时间字符串"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+
+templates.env.filters["format_timestamp"] = format_timestamp
+
+# 天气数据缓存：按(纬度, 经度)保留两位小数作为键（约1公里内的城市共享同一条目），
+# 10分钟过期，避免短时间内重复请求Open-Meteo
+WEATHER_CACHE = TTLCache(maxsize=10_000, ttl=600)
+# HTTP条件请求缓存：一次多地点请求对应一个响应，因此按整批坐标记录
+# (ETag, Last-Modified, 温度列表)，缓存过期后重新请求时携带校验头，未变化则服务端返回304
+WEATHER_VALIDATORS = TTLCache(maxsize=1_000, ttl=3600)
+# 天气API并发上限：城市较多时分批在途，避免瞬时请求过多被限流（免费版约600次/分钟）
+FETCH_SEM = asyncio.Semaphore(20)
+# Open-Meteo天气API地址（模块加载时构造一次，请求参数交由aiohttp编码）
+OPEN_METEO_API = URL("https://api.open-meteo.com/v1/forecast")
+# 多地点批量请求时每批的坐标数量上限（控制URL长度）
+BULK_CHUNK_SIZE = 50
+# CSV经纬度字段的合法数字格式（用于向量化过滤无法转换的值）
+FLOAT_PATTERN = r"^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$"
+# 温度更新冷却时间（15分钟，单位纳秒）及本进程最后一次更新的单调时钟时间戳
+UPDATE_COOLDOWN_NS = 900 * 1_000_000_000
+last_update_ns: Optional[int] = None
+
 # -------------------------- 2. 数据库依赖（统一会话管理） --------------------------
 def get_db() -> Generator[Session, None, None]:
     """数据库会话依赖项：每个请求创建独立会话，请求结束自动关闭
@@ -47,43 +104,150 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 # -------------------------- 3. 核心工具函数（单一职责原则） --------------------------
-async def fetch_weather(latitude: float, longitude: float) -> float:
-    """异步请求Open-Meteo API获取实时温度(摄氏度)
+async def fetch_weather_chunk(
+    session: aiohttp.ClientSession,
+    coords: List[Tuple[float, float]]
+) -> List[float]:
+    """单次请求Open-Meteo多地点接口，获取一批坐标的实时温度(摄氏度)
     
     参数：
-        latitude: 城市纬度(范围：-90 ~ 90)
-        longitude: 城市经度(范围：-180 ~ 180)
+        session: 应用级共享的HTTP会话（复用连接池，避免每次请求重复建立TLS连接）
+        coords: (纬度, 经度)列表，纬度范围-90 ~ 90，经度范围-180 ~ 180
     
     返回：
-        float: 实时温度值
+        List[float]: 与coords顺序一致的实时温度列表
     
     异常：
         HTTPException: API请求失败或数据解析错误时抛出
     """
-    # API请求地址（严格遵循Open-Meteo接口规范）
-    api_url = (
-        f"https://api.open-meteo.com/v1/forecast"
-        f"?latitude={latitude}&longitude={longitude}"
-        f"&current_weather=true&hourly=temperature_2m"
-    )
+    # 请求参数（多地点接口：经纬度以逗号分隔，严格遵循Open-Meteo接口规范）
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in coords),
+        "longitude": ",".join(str(lon) for _, lon in coords),
+        "current_weather": "true"  # 只请求实时天气，不拉取未使用的逐小时序列
+    }
+    # 同一批坐标曾返回过ETag/Last-Modified时，发送条件请求头
+    chunk_key = tuple(coords)
+    validator = WEATHER_VALIDATORS.get(chunk_key)
+    headers = {}
+    if validator is not None:
+        etag, last_modified, _ = validator
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
     
     try:
-        # 异步请求（aiohttp，符合实验异步要求）
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-            async with session.get(api_url) as response:
+        # 信号量限制同时在途的API请求数，避免触发Open-Meteo限流
+        async with FETCH_SEM:
+            # 异步请求（aiohttp，符合实验异步要求）
+            async with session.get(OPEN_METEO_API, params=params, headers=headers) as response:
+                # 304：数据未变化，无响应体，直接沿用上次的温度
+                if response.status == 304 and validator is not None:
+                    return list(validator[2])
                 if response.status != 200:
                     raise HTTPException(
                         status_code=503,
                         detail=f"天气API请求失败，状态码：{response.status}"
                     )
-                # 解析API响应数据
-                response_data = await response.json()
-                return response_data["current_weather"]["temperature"]
+                # 解析API响应数据（orjson解析原始字节，快于标准库json）
+                response_data = orjson.loads(await response.read())
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
     
     except aiohttp.ClientError as e:
         raise HTTPException(status_code=500, detail=f"网络请求错误：{str(e)}")
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=500, detail=f"API响应数据解析错误：{str(e)}")
+    
+    # 多个坐标时返回数组，仅一个坐标时返回单个对象
+    if isinstance(response_data, dict):
+        response_data = [response_data]
+    if len(response_data) != len(coords):
+        raise HTTPException(status_code=500, detail="API响应数据格式错误：返回地点数量与请求不一致")
+    try:
+        temperatures = [item["current_weather"]["temperature"] for item in response_data]
     except KeyError as e:
         raise HTTPException(status_code=500, detail=f"API响应数据格式错误：缺少{e}字段")
+    
+    # 记录校验头，供下次条件请求使用
+    if etag or last_modified:
+        WEATHER_VALIDATORS[chunk_key] = (etag, last_modified, temperatures)
+    return temperatures
+
+
+async def fetch_weather_bulk(
+    session: aiohttp.ClientSession,
+    coords: List[Tuple[float, float]]
+) -> List[Union[float, Exception]]:
+    """批量获取多个坐标的实时温度：优先读缓存，未命中的坐标去重后分批并发请求
+    
+    单个批次失败不影响其他批次，失败批次内的坐标对应位置返回异常对象
+    
+    参数：
+        session: 应用级共享的HTTP会话
+        coords: (纬度, 经度)列表
+    
+    返回：
+        List[Union[float, Exception]]: 与coords顺序一致的实时温度（或请求异常）列表
+    """
+    # 坐标保留两位小数作为缓存键（约1公里内的城市共享同一条目）
+    keys = [(round(lat, 2), round(lon, 2)) for lat, lon in coords]
+    temperatures: Dict[Tuple[float, float], Union[float, Exception]] = {}
+    for key in keys:
+        cached = WEATHER_CACHE.get(key)
+        if cached is not None:
+            temperatures[key] = cached
+    
+    # 未命中缓存的坐标去重后按批次切分，每批一次HTTP请求
+    missing = list(dict.fromkeys(key for key in keys if key not in temperatures))
+    chunks = [missing[i:i + BULK_CHUNK_SIZE] for i in range(0, len(missing), BULK_CHUNK_SIZE)]
+    results = await asyncio.gather(
+        *(fetch_weather_chunk(session, chunk) for chunk in chunks),
+        return_exceptions=True
+    )
+    
+    for chunk, chunk_temperatures in zip(chunks, results):
+        if isinstance(chunk_temperatures, Exception):
+            # 失败批次只记录异常，不写入缓存
+            for key in chunk:
+                temperatures[key] = chunk_temperatures
+            continue
+        for key, temperature in zip(chunk, chunk_temperatures):
+            WEATHER_CACHE[key] = temperature
+            temperatures[key] = temperature
+    
+    return [temperatures[key] for key in keys]
+
+
+def parse_float_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """将字符串列向量化转换为float64列，非数字内容转换为null（而非整体报错）
+    
+    参数：
+        column: CSV中读取的字符串列
+    
+    返回：
+        pa.ChunkedArray: float64列，无效值为null
+    """
+    column = pc.utf8_trim_whitespace(column)
+    is_number = pc.match_substring_regex(column, FLOAT_PATTERN)
+    return pc.cast(pc.if_else(is_number, column, pa.scalar(None, pa.string())), pa.float64())
+
+
+def skip_invalid_csv_row(row: pac.InvalidRow) -> str:
+    """pyarrow CSV解析回调：字段数量与表头不一致的行（如城市名含未加引号的逗号）直接跳过
+    
+    参数：
+        row: pyarrow提供的无效行信息（含行号与原始文本）
+    
+    返回：
+        str: 固定返回"skip"，跳过该行而不中断整体解析
+    """
+    print(
+        f"跳过无效城市数据：{row.text}，"
+        f"原因：字段数量不符（应为{row.expected_columns}个，实际{row.actual_columns}个）"
+    )
+    return "skip"
 
 
 def init_default_cities(db: Session) -> None:
@@ -96,42 +260,59 @@ def init_default_cities(db: Session) -> None:
     if db.query(DefaultCity).first() is not None:
         return
     
-    # 读取CSV文件（处理编码与文件不存在异常）
+    # 读取CSV文件（pyarrow多线程C++解析器，处理编码与文件不存在异常）
+    # 三个字段均按字符串读取，由下方向量化校验剔除无效行，避免单行坏数据导致整体解析失败
     try:
-        with open("europe.csv", "r", encoding="utf-8-sig") as csv_file:
-            # 按CSV表头解析数据（匹配europe.csv格式）
-            csv_reader = csv.DictReader(csv_file)
-            for row in csv_reader:
-                # 数据类型转换与校验（避免无效数据）
-                try:
-                    latitude = float(row["latitude"])
-                    longitude = float(row["longitude"])
-                    # 纬度/经度范围校验（符合地理常识）
-                    if not (-90 <= latitude <= 90):
-                        raise ValueError(f"纬度{latitude}超出范围（-90~90）")
-                    if not (-180 <= longitude <= 180):
-                        raise ValueError(f"经度{longitude}超出范围（-180~180）")
-                    
-                    # 添加默认城市到数据库
-                    default_city = DefaultCity(
-                        name=row["name"].strip(),
-                        latitude=latitude,
-                        longitude=longitude
-                    )
-                    db.add(default_city)
-                
-                except ValueError as e:
-                    # 跳过无效数据，不中断整体初始化
-                    print(f"跳过无效城市数据：{row['name']}，原因：{str(e)}")
-        
-        # 提交事务（确保数据写入）
-        db.commit()
-        print("默认城市表初始化完成（数据来源：europe.csv）")
-    
+        table = pac.read_csv(
+            "europe.csv",
+            parse_options=pac.ParseOptions(invalid_row_handler=skip_invalid_csv_row),
+            convert_options=pac.ConvertOptions(
+                column_types={
+                    "name": pa.string(),
+                    "latitude": pa.string(),
+                    "longitude": pa.string()
+                },
+                strings_can_be_null=False  # 城市名按原样读取（如"NA"不被识别为缺失值）
+            )
+        )
     except FileNotFoundError:
         raise RuntimeError("初始化失败：未找到europe.csv文件，请检查文件路径")
-    except csv.Error as e:
+    except pa.ArrowInvalid as e:
         raise RuntimeError(f"CSV文件解析错误：{str(e)}")
+    if not {"name", "latitude", "longitude"}.issubset(table.column_names):
+        raise RuntimeError("CSV文件缺少必要字段（name/latitude/longitude）")
+    
+    # 数据类型转换与校验（向量化执行，无法转换为数字的值记为null）
+    names = pc.utf8_trim_whitespace(table["name"])
+    latitudes = parse_float_column(table["latitude"])
+    longitudes = parse_float_column(table["longitude"])
+    # 纬度/经度范围校验（符合地理常识；null视为无效）
+    valid = pc.fill_null(
+        pc.and_(
+            pc.not_equal(names, ""),
+            pc.and_(
+                pc.and_(pc.greater_equal(latitudes, -90), pc.less_equal(latitudes, 90)),
+                pc.and_(pc.greater_equal(longitudes, -180), pc.less_equal(longitudes, 180))
+            )
+        ),
+        False
+    )
+    cities = pa.table({"name": names, "latitude": latitudes, "longitude": longitudes})
+    
+    # 跳过无效数据，不中断整体初始化
+    for row in cities.filter(pc.invert(valid)).to_pylist():
+        print(
+            f"跳过无效城市数据：{row['name']}，"
+            f"原因：名称为空或经纬度无效、超出范围（纬度{row['latitude']}，经度{row['longitude']}）"
+        )
+    
+    # Core批量插入（单条executemany，绕过ORM逐行对象管理）
+    rows = cities.filter(valid).to_pylist()
+    if rows:
+        db.execute(DefaultCity.__table__.insert(), rows)
+    # 提交事务（确保数据写入）
+    db.commit()
+    print("默认城市表初始化完成（数据来源：europe.csv）")
 
 
 def reset_cities_to_default(db: Session) -> None:
@@ -140,6 +321,7 @@ def reset_cities_to_default(db: Session) -> None:
     参数：
         db: 数据库会话对象
     """
+    global last_update_ns
     # 清空当前城市表（先删后加，避免重复）
     db.query(City).delete()
     # 从默认表查询所有城市
@@ -147,38 +329,75 @@ def reset_cities_to_default(db: Session) -> None:
     if not default_cities:
         raise HTTPException(status_code=500, detail="默认城市数据为空，无法重置")
     
-    # 同步默认城市到当前表
-    for default_city in default_cities:
-        db.add(City(
-            name=default_city.name,
-            latitude=default_city.latitude,
-            longitude=default_city.longitude,
-            temperature=None,  # 初始无温度数据
-            updated_at=None    # 初始无更新时间
-        ))
-    
+    # 同步默认城市到当前表（单次批量插入）
+    rows = [
+        {
+            "name": default_city.name,
+            "latitude": default_city.latitude,
+            "longitude": default_city.longitude,
+            "temperature": None,  # 初始无温度数据
+            "updated_at": None    # 初始无更新时间
+        }
+        for default_city in default_cities
+    ]
+    db.execute(City.__table__.insert(), rows)
     db.commit()
+    
+    # 重置后所有城市均无更新记录，同步清除本进程的冷却计时，允许立即更新
+    last_update_ns = None
 
 
-def check_update_cooldown(db: Session) -> bool:
+def check_update_cooldown(last_updated: Optional[int]) -> bool:
     """检查温度更新冷却时间（15分钟内不允许重复更新）
     
+    本进程内已完成过更新时，使用单调时钟计算间隔（整数运算，不受系统时间调整影响）；
+    应用重启后尚无记录时，回退到数据库中的最后更新时间
+    
     参数：
-        db: 数据库会话对象
+        last_updated: 所有城市中最新的更新时间（UTC Unix时间戳，无更新记录时为None）
     
     返回：
         bool: True=可更新（超过15分钟），False=不可更新（冷却中）
     """
-    # 查询最后一次更新时间（取所有城市中最新的updated_at）
-    last_updated = db.query(City.updated_at).order_by(City.updated_at.desc()).first()
-    if not last_updated or last_updated[0] is None:
+    if last_update_ns is not None:
+        return time.monotonic_ns() - last_update_ns >= UPDATE_COOLDOWN_NS
+    
+    if last_updated is None:
         # 无更新记录，允许更新
         return True
     
-    # 计算当前时间与最后更新时间的差值
-    time_diff = datetime.now() - last_updated[0]
-    # 15分钟冷却判断（转换为秒：15*60=900秒）
-    return time_diff.total_seconds() >= 900
+    # 计算当前时间与最后更新时间的差值，15分钟冷却判断（15*60=900秒）
+    return int(time.time()) - last_updated >= 900
+
+
+def load_cities_for_update(db: Session) -> list:
+    """单次查询同时取出城市列表与最后更新时间（窗口函数MAX，避免额外一次查询）
+    
+    参数：
+        db: 数据库会话对象
+    
+    返回：
+        list: 包含id、latitude、longitude、last_updated字段的Row列表
+    """
+    return db.execute(
+        select(
+            City.id,
+            City.latitude,
+            City.longitude,
+            func.max(City.updated_at).over().label("last_updated")
+        )
+    ).all()
+
+
+def persist_weather_updates(db: Session, updates: List[dict]) -> None:
+    """批量写入温度与更新时间（一次executemany替代逐行刷新）
+    
+    参数：
+        db: 数据库会话对象
+        updates: 包含id、temperature、updated_at的字典列表
+    """
+    db.bulk_update_mappings(City, updates)
+    db.commit()
 
 # -------------------------- 4. 启动事件（初始化操作） --------------------------
 @app.on_event("startup")
@@ -187,9 +406,21 @@ def startup_init() -> None:
     1. 创建所有数据库表（若不存在）
     2. 初始化默认城市表（从europe.csv导入）
     3. 若当前城市表为空，自动同步默认数据
+    4. 创建全局共享的HTTP会话（keep-alive连接池，供所有天气请求复用）
     """
     # 创建数据库表（基于models定义）
     Base.metadata.create_all(bind=engine)
+    # create_all不会为已存在的表补建索引，这里对已有数据库补建缺失索引
+    for index in City.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    # 旧版本以文本格式（ISO时间）存储updated_at，统一转换为Unix时间戳
+    # 旧值由datetime.now()写入，为本地时间，需加'utc'修饰符先换算为UTC再取时间戳
+    with engine.begin() as connection:
+        connection.execute(
+            update(City)
+            .where(func.typeof(City.updated_at) == "text")
+            .values(updated_at=cast(func.strftime("%s", City.updated_at, "utc"), Integer))
+        )
     # 获取数据库会话
     db = next(get_db())
     try:
@@ -201,15 +432,43 @@ def startup_init() -> None:
             print("当前城市表为空，已自动同步默认城市数据")
     finally:
         db.close()
+    
+    # 共享HTTP会话：复用TCP/TLS连接，缓存DNS解析结果
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=50,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        ),
+        timeout=aiohttp.ClientTimeout(total=10),
+        # 明确声明接受压缩响应，由aiohttp自动解压（多地点批量响应的JSON重复度高，压缩收益明显）
+        headers={"Accept-Encoding": "gzip, deflate"},
+        auto_decompress=True
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_cleanup() -> None:
+    """应用关闭时释放共享HTTP会话及其连接池"""
+    await app.state.http.close()
 
 # -------------------------- 5. 路由接口（完全匹配实验要求） --------------------------
 @app.get("/", response_class=HTMLResponse, summary="首页：展示城市天气列表")
-async def read_index(
+def read_index(
     request: Request,
     db: Session = Depends(get_db)
 ):  # 移除-> TemplateResponse
-    cities = db.query(City).order_by(
-        City.temperature.desc().nullslast()
+    # 仅查询页面所需字段，返回轻量Row对象（无需构造完整ORM实例）
+    cities = db.execute(
+        select(
+            City.id,
+            City.name,
+            City.latitude,
+            City.longitude,
+            City.temperature,
+            City.updated_at
+        ).order_by(City.temperature.desc().nullslast())
     ).all()
     return templates.TemplateResponse(
         "index.html",
@@ -218,7 +477,7 @@ async def read_index(
 
 
 @app.post("/cities/add", summary="添加新城市")
-async def add_city(
+def add_city(
     name: str = Form(..., min_length=1, max_length=50, description="城市名称（不可重复）"),
     latitude: float = Form(..., ge=-90, le=90, description="纬度（-90~90）"),
     longitude: float = Form(..., ge=-180, le=180, description="经度（-180~180）"),
@@ -243,7 +502,7 @@ async def add_city(
 
 
 @app.post("/cities/remove/{city_id}", summary="删除指定城市")
-async def remove_city(
+def remove_city(
     city_id: int = Path(..., ge=1, description="城市ID（正整数）"),
     db: Session = Depends(get_db)
 ) -> RedirectResponse:
@@ -262,7 +521,7 @@ async def remove_city(
 
 
 @app.post("/cities/reset", summary="重置城市列表")
-async def reset_cities(
+def reset_cities(
     db: Session = Depends(get_db)
 ) -> RedirectResponse:
     """将当前城市列表重置为默认数据（从DefaultCity同步）"""
@@ -275,33 +534,45 @@ async def update_weather(
     db: Session = Depends(get_db)
 ) -> RedirectResponse:
     """异步更新所有城市温度，包含15分钟冷却限制，避免频繁请求API"""
+    global last_update_ns
+    # 同步的SQLite操作放入线程池执行，避免阻塞事件循环
+    cities = await asyncio.to_thread(load_cities_for_update, db)
+    if not cities:
+        raise HTTPException(status_code=400, detail="当前无城市数据，无法更新温度")
+    
     # 检查冷却时间（符合实验“15分钟不重复更新”要求）
-    if not check_update_cooldown(db):
+    if not check_update_cooldown(cities[0].last_updated):
         raise HTTPException(
             status_code=400,
             detail="距离上次更新不足15分钟,请稍后再试"
         )
     
-    # 查询所有需要更新的城市
-    cities = db.query(City).all()
-    if not cities:
-        raise HTTPException(status_code=400, detail="当前无城市数据，无法更新温度")
+    # 异步批量获取所有城市温度（多地点接口合并请求，批次间asyncio.gather并发）
+    coords = [(city.latitude, city.longitude) for city in cities]
+    results = await fetch_weather_bulk(app.state.http, coords)
     
-    # 异步批量获取所有城市温度（asyncio.gather，符合实验异步要求）
-    # 创建任务列表：每个城市对应一个天气请求任务
-    tasks = [fetch_weather(city.latitude, city.longitude) for city in cities]
-    try:
-        # 并发执行所有异步任务
-        temperatures = await asyncio.gather(*tasks)
-    except HTTPException as e:
-        # 捕获API请求异常，返回详细错误信息
-        raise HTTPException(status_code=e.status_code, detail=e.detail)
-    
-    # 更新数据库中的温度和时间
-    current_time = datetime.now()
-    for city, temp in zip(cities, temperatures):
-        city.temperature = temp
-        city.updated_at = current_time
+    # 只更新获取成功的城市，失败的城市保留原有数据
+    current_time = int(time.time())
+    updates = [
+        {"id": city.id, "temperature": result, "updated_at": current_time}
+        for city, result in zip(cities, results)
+        if not isinstance(result, Exception)
+    ]
+    failures = [result for result in results if isinstance(result, Exception)]
+    if not updates:
+        # 全部失败：返回第一个异常的详细错误信息
+        error = failures[0]
+        if isinstance(error, HTTPException):
+            raise HTTPException(status_code=error.status_code, detail=error.detail)
+        raise HTTPException(status_code=500, detail=f"天气数据获取失败：{str(error)}")
     
-    db.commit()
-    return RedirectResponse(url="/", status_code=303)
\ No newline at end of file
+    # 更新数据库中的温度和时间（线程池中执行批量UPDATE与提交）
+    await asyncio.to_thread(persist_weather_updates, db, updates)
+    last_update_ns = time.monotonic_ns()
+    
+    if failures:
+        # 部分失败：记录失败数量并通过首页错误提示展示
+        print(f"温度更新部分失败：{len(failures)}个城市未能获取数据")
+        message = f"{len(failures)}个城市温度获取失败，其余城市已更新"
+        return RedirectResponse(url=f"/?error={quote(message)}", status_code=303)
+    return RedirectResponse(url="/", status_code=303)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float
 from sqlalchemy.orm import declarative_base
 
 # 基础模型类，所有数据表模型继承此类
@@ -14,7 +14,7 @@ class City(Base):
     - latitude: 城市纬度（范围：-90 ~ 90）
     - longitude: 城市经度（范围：-180 ~ 180）
     - temperature: 实时温度（可空，初始无数据）
-    - updated_at: 最后更新时间（可空，记录温度更新时间）
+    - updated_at: 最后更新时间（可空，UTC Unix时间戳/秒；带索引，加速冷却时间查询）
     """
     __tablename__ = "cities"
     
@@ -23,7 +23,7 @@ class City(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     temperature = Column(Float, nullable=True)
-    updated_at = Column(DateTime, nullable=True)
+    updated_at = Column(Integer, nullable=True, index=True)
 
 
 class DefaultCity(Base):